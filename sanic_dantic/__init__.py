@@ -9,7 +9,7 @@ CreateTime:  2023-01-23
 import pydantic
 from pydantic import *  # noqa
 
-from .basic_definition import DanticModelObj, ParsedArgsObj
+from .basic_definition import DanticModelObj, ParsedArgsObj, validate
 from .sanic_class_dantic import DanticView
 from .sanic_function_dantic import parse_params
 
@@ -17,7 +17,8 @@ __all__ = [
     "DanticView",
     "parse_params",
     "ParsedArgsObj",
-    "DanticModelObj"
+    "DanticModelObj",
+    "validate",
 ]
 
 __all__ = __all__ + pydantic.__all__
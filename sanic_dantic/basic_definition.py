@@ -10,14 +10,270 @@ CreateTime:  2023-01-23
 import json
 
 from copy import deepcopy
-from inspect import getmro
-from typing import Any, Callable, Type, Union
+from datetime import date, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from operator import attrgetter
+from typing import Any, Callable, NoReturn, Optional, Tuple, Type, Union
+from uuid import UUID
+
+try:
+    from typing import Literal
+except ImportError:
+    Literal = None
+
+try:
+    from types import UnionType
+except ImportError:
+    UnionType = None
+
+
+from pydantic import VERSION, BaseModel, ValidationError
+from sanic.exceptions import InvalidUsage, SanicException, ServerError
+from sanic.log import error_logger
+from sanic.request import Request, RequestParameters
 
+PYDANTIC_V2 = VERSION.startswith('2')
 
-from pydantic import BaseModel, ValidationError
-from sanic.exceptions import InvalidUsage, ServerError
-from sanic.log import error_logger
-from sanic.request import Request
+if PYDANTIC_V2:
+    from pydantic import PlainSerializer, WrapSerializer
+
+    SERIALIZER_TYPES = (PlainSerializer, WrapSerializer)
+
+FORM_MEDIA_TYPES = frozenset((
+    'application/x-www-form-urlencoded',
+    'multipart/form-data',
+))
+
+# validated values of these types are the same as their export
+# 这些类型校验后的值与导出结果相同
+PLAIN_TYPES = (
+    str, int, float, bool, bytes, type(None), Decimal,
+    date, time, timedelta, UUID, Enum,
+    list, tuple, set, frozenset, dict,
+)
+PLAIN_GENERICS = (list, tuple, set, frozenset, dict, Union)
+UNION_TYPES = (UnionType,) if UnionType else ()
+
+IMMUTABLE_TYPES = frozenset((str, int, float, bool, bytes, type(None)))
+
+
+def get_validator(model: Type[BaseModel]) -> Callable[[Any], BaseModel]:
+    """
+    Return the fastest callable that validates a mapping into the model,
+    pydantic v2 exposes the pydantic-core validator directly,
+    pydantic v1 falls back to parse_obj. It is resolved on each call,
+    so a model rebuilt with model_rebuild() uses its new validator.
+
+    返回将字典校验为模型的最快的可调用对象，
+    pydantic v2 直接使用 pydantic-core 的校验器，pydantic v1 使用 parse_obj。
+    每次调用时重新获取，因此 model_rebuild() 后会使用新的校验器。
+    """
+
+    validator = getattr(model, '__pydantic_validator__', None)
+    if validator is not None:
+        return validator.validate_python
+    return model.parse_obj
+
+
+def is_plain_annotation(annotation: Any) -> bool:
+    """
+    Whether values of the annotation are exported unchanged, that is plain
+    scalars and builtin containers of them, any other type is exported.
+
+    判断该类型注解的值导出后是否保持不变，即普通标量及其内置容器，
+    其它任何类型都需要导出。
+    """
+
+    origin = getattr(annotation, '__origin__', None)
+    if origin is None and isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return False
+        return issubclass(annotation, PLAIN_TYPES)
+    if origin is not None and origin is Literal:
+        return True
+    if origin not in PLAIN_GENERICS and (
+            not isinstance(annotation, UNION_TYPES)
+    ):
+        return False
+    return all(
+        arg is Ellipsis or is_plain_annotation(arg)
+        for arg in getattr(annotation, '__args__', ())
+    )
+
+
+def is_flat_model(model: Type[BaseModel]) -> bool:
+    """
+    Whether the __dict__ of a validated model already equals its export,
+    models with nested models, extra, computed, excluded or custom
+    serialized fields must be exported.
+
+    判断校验后模型的 __dict__ 是否与导出结果一致，包含嵌套模型、额外字段、
+    计算字段、排除字段或自定义序列化的模型需要导出。
+    """
+
+    if PYDANTIC_V2:
+        decorators = model.__pydantic_decorators__
+        if (
+                getattr(model, '__pydantic_root_model__', False) or
+                model.model_config.get('extra') == 'allow' or
+                model.model_computed_fields or
+                decorators.field_serializers or
+                decorators.model_serializers
+        ):
+            return False
+        fields = model.model_fields.values()
+        for field in fields:
+            if field.exclude or any(
+                    isinstance(meta, SERIALIZER_TYPES)
+                    for meta in field.metadata
+            ):
+                return False
+        annotations = [field.annotation for field in fields]
+    else:
+        fields = model.__fields__.values()
+        for field in fields:
+            if (
+                    getattr(field.field_info, 'exclude', None) is not None or
+                    getattr(field.field_info, 'include', None) is not None
+            ):
+                return False
+        annotations = [field.outer_type_ for field in fields]
+    return all(is_plain_annotation(annotation) for annotation in annotations)
+
+
+def raise_server_error(message: str) -> NoReturn:
+    """
+    Log the message and raise it as a ServerError.
+
+    记录错误信息并抛出 ServerError。
+    """
+
+    error_logger.error(message)
+    raise ServerError(message)
+
+
+def flatten_params(params: RequestParameters) -> dict:
+    """
+    Flatten sanic request parameters, a key with a single value is
+    unwrapped from its list, a key with multiple values keeps the list.
+
+    展开 sanic 的请求参数，只有一个值的参数会从列表中取出，多个值的参数保留列表。
+    """
+
+    # a plain comprehension over items() measures faster than building the
+    # dict from C builtins (map/zip/itemgetter) on CPython, keep it simple
+    # 在 CPython 上直接使用推导式比使用 map/zip/itemgetter 等内置函数更快
+    return {
+        key: val[0] if len(val) == 1 else val
+        for key, val in params.items()
+    }
+
+
+def parse_form(request: Request) -> Tuple[dict, Optional[dict]]:
+    """
+    Flatten the request form and split out its payload_json field,
+    the payload is only returned when it decodes to a JSON object.
+
+    展开请求的表单并取出其中的 payload_json 字段，
+    只有当它能解析为 JSON 对象时才会返回。
+    """
+
+    form_data = flatten_params(request.form)
+    payload_json = form_data.pop('payload_json', None)
+    if payload_json is not None:
+        try:
+            payload_json = json.loads(payload_json)
+        except (TypeError, ValueError):
+            pass
+
+    if not isinstance(payload_json, dict):
+        payload_json = None
+    return form_data, payload_json
+
+
+class RequestParams:
+    """
+    Collect the parameters of a request for each kind of model,
+    each property returns the inputs to validate in order,
+    the query string and form are only flattened once even if
+    several models use them.
+
+    为每种模型收集请求参数，每个属性按顺序返回需要校验的输入，
+    即使多个模型都用到，查询参数和表单也只会展开一次。
+    """
+
+    __slots__ = ('request', '_query', '_form')
+
+    def __init__(self, request: Request) -> None:
+        self.request = request
+        self._query = None
+        self._form = None
+
+    @property
+    def headers(self) -> Tuple[dict]:
+        return (dict(self.request.headers),)
+
+    @property
+    def match_info(self) -> Tuple[dict]:
+        # match_info is already a plain dict and validation does not mutate it
+        # match_info 本身就是 dict，校验时不会修改它，无需复制
+        return (self.request.match_info,)
+
+    @property
+    def query(self) -> Tuple[dict]:
+        return (self._flatten_query(),)
+
+    @property
+    def form(self) -> Tuple[dict, ...]:
+        # payload_json is validated on its own before the rest of the form
+        # payload_json 会先于表单的其它字段单独校验
+        form_params, payload_json = self._parse_form()
+        if payload_json is None:
+            return (form_params,)
+        return (payload_json, form_params)
+
+    @property
+    def body(self) -> Tuple[Any]:
+        return (self.request.json,)
+
+    @property
+    def all(self) -> Tuple[dict]:
+        request = self.request
+        media_type = (request.content_type or '').split(';', 1)[0]
+        if media_type.strip().lower() in FORM_MEDIA_TYPES:
+            form_params, payload_json = self._parse_form()
+            body_params = form_params
+            if payload_json is not None:
+                body_params = {**form_params, **payload_json}
+        else:
+            # any other body may still be JSON, e.g. application/*+json
+            # 其它类型的请求体仍可能是 JSON，例如 application/*+json
+            try:
+                body_params = request.json
+            except InvalidUsage:
+                body_params = None
+            if not isinstance(body_params, dict):
+                body_params = {}
+
+        # later sources win: body > query > path > header
+        # 后面的参数覆盖前面的参数：body > query > path > header
+        return ({
+            **request.headers,
+            **request.match_info,
+            **self._flatten_query(),
+            **body_params,
+        },)
+
+    def _flatten_query(self) -> dict:
+        if self._query is None:
+            self._query = flatten_params(self.request.args)
+        return self._query
+
+    def _parse_form(self) -> Tuple[dict, Optional[dict]]:
+        if self._form is None:
+            self._form = parse_form(self.request)
+        return self._form
 
 
 class ParsedArgsObj(dict):
@@ -29,14 +285,62 @@ class ParsedArgsObj(dict):
     在使用时，可以直接使用属性访问参数。
     """
 
-    def __getattr__(self, item):
-        return self.get(item)
+    __slots__ = ('__fields_set__',)
+
+    # attribute reads go straight to the C implementation of dict
+    # 属性读取直接使用 dict 的 C 实现
+    __getattr__ = dict.get
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        object.__setattr__(self, '__fields_set__', set())
 
     def __setattr__(self, key, value):
-        self.update({key: value})
+        if key == '__fields_set__':
+            object.__setattr__(self, key, value)
+        else:
+            self[key] = value
+
+    def __getstate__(self):
+        return self.__fields_set__
+
+    def __setstate__(self, state):
+        object.__setattr__(self, '__fields_set__', set(state))
 
     def __deepcopy__(self, memo=None):
-        return ParsedArgsObj(deepcopy(dict(self), memo=memo))
+        # immutable values are shared, only containers are copied recursively
+        # 不可变的值直接共享，只有容器类型会被递归复制
+        if memo is None:
+            memo = {}
+        new = memo[id(self)] = ParsedArgsObj()
+        for key, val in self.items():
+            if type(val) not in IMMUTABLE_TYPES:
+                val = deepcopy(val, memo)
+            new[key] = val
+        new.__fields_set__.update(self.__fields_set__)
+        return new
+
+    def __combine_base_model__(
+            self,
+            obj: BaseModel,
+            flat: bool = True
+    ) -> None:
+        """
+        Merge the fields of a validated model into self,
+        and record which of them were explicitly set by the request.
+        Flat models are merged from __dict__, others are exported first.
+
+        将校验后的模型字段合并到自身，并记录请求中显式设置的字段。
+        扁平的模型直接合并 __dict__，其它模型会先导出为 dict。
+        """
+
+        if flat:
+            self.update(obj.__dict__)
+        else:
+            self.update(obj.model_dump() if PYDANTIC_V2 else obj.dict())
+        self.__fields_set__.update(
+            obj.__pydantic_fields_set__ if PYDANTIC_V2 else obj.__fields_set__
+        )
 
 
 class DanticModelObj:
@@ -47,6 +351,10 @@ class DanticModelObj:
     用于解析和判断 pydantic 模型的参数， 方便 DanticView 和 parse_params 使用。
     """
 
+    __slots__ = (
+        'header', 'query', 'path', 'body', 'form', 'all', 'error', '_pipeline',
+    )
+
     def __init__(
             self,
             header: Type[BaseModel] = None,
@@ -69,38 +377,50 @@ class DanticModelObj:
         When there are the same parameter name in the model,
         """
 
-        try:
-
-            self.header = header
-            self.query = query
-            self.path = path
-            self.body = body
-            self.form = form
-            self.all = all
-            self.error = error
-
-            if body and form:
-                raise AssertionError(
+        self.header = header
+        self.query = query
+        self.path = path
+        self.body = body
+        self.form = form
+        self.all = all
+        self.error = error
+
+        if body and form:
+            raise_server_error(
+                "sanic-dantic: " +
+                "body and form cannot be used at the same time."
+            )
+
+        for model in (header, path, query, form, body, all):
+            if model is not None and not (
+                    isinstance(model, type) and
+                    issubclass(model, BaseModel)
+            ):
+                raise_server_error(
                     "sanic-dantic: " +
-                    "body and form cannot be used at the same time."
+                    "model must inherited from Pydantic.BaseModel"
                 )
 
-            for model in [header, path, query, form, body, all]:
-                if model and BaseModel not in getmro(model):
-                    raise AssertionError(
-                        "sanic-dantic: " +
-                        "model must inherited from Pydantic.BaseModel"
-                    )
-
-            if error and error is not True and not isinstance(error, Callable):
-                raise AssertionError(
-                    "sanic-dantic: " +
-                    "the error handler must be a callable function or True"
-                )
-
-        except AssertionError as e:
-            error_logger.error(e)
-            raise ServerError(str(e))
+        if error and error is not True and not callable(error):
+            raise_server_error(
+                "sanic-dantic: " +
+                "the error handler must be a callable function or True"
+            )
+
+        # (parameter source, model, flat) for the configured models,
+        # validate() runs through them in order without checking each slot
+        # 已配置模型的 (参数来源, 模型, 是否扁平)，validate() 按顺序执行
+        self._pipeline = tuple(
+            (attrgetter(source), model, is_flat_model(model))
+            for source, model in (
+                ('headers', header),
+                ('match_info', path),
+                ('query', query),
+                ('form', form),
+                ('body', body),
+                ('all', all),
+            ) if model
+        )
 
 
 def validate(request: Request, dmo: DanticModelObj) -> Any:
@@ -118,74 +438,11 @@ def validate(request: Request, dmo: DanticModelObj) -> Any:
 
     try:
         parsed_args = ParsedArgsObj()
-
-        if dmo.header:
-            parsed_args.update(dmo.header(**request.headers).dict())
-
-        if dmo.path:
-            parsed_args.update(dmo.path(**request.match_info).dict())
-
-        if dmo.query:
-            params = {
-                key: val[0] if len(val) == 1 else val
-                for key, val in request.args.items()
-            }
-            parsed_args.update(dmo.query(**params).dict())
-
-        if dmo.form:
-            form_data = {
-                key: val[0] if len(val) == 1 else val
-                for key, val in request.form.items()
-            }
-            if 'payload_json' in form_data:
-                payload_json = form_data.pop('payload_json')
-                try:
-                    payload_json = json.loads(payload_json)
-                except:
-                    pass
-
-                if isinstance(payload_json, dict):
-                    parsed_args.update(dmo.form(**payload_json).dict())
-
-            parsed_args.update(dmo.form(**form_data).dict())
-
-        elif dmo.body:
-            parsed_args.update(dmo.body(**request.json).dict())
-
-
-        if dmo.all:
-            query_params = {
-                key: val[0] if len(val) == 1 else val
-                for key, val in request.args.items()
-            }
-            body_params = {}
-            try:
-                body_params = request.json
-                if not isinstance(body_params, dict):
-                    body_params = {}
-            except:
-                body_params = {
-                    key: val[0] if len(val) == 1 else val
-                    for key, val in request.form.items()
-                }
-
-                if 'payload_json' in body_params:
-                    payload_json = body_params.pop('payload_json')
-                    try:
-                        payload_json = json.loads(payload_json)
-                    except:
-                        pass
-
-                    if isinstance(payload_json, dict):
-                        body_params.update(**payload_json)
-
-            params = {}
-            params.update(request.headers)
-            params.update(request.match_info)
-            params.update(query_params)
-            params.update(body_params)
-
-            parsed_args.update(dmo.all(**params).dict())
+        params = RequestParams(request)
+        for get_params, model, flat in dmo._pipeline:
+            validator = get_validator(model)
+            for data in get_params(params):
+                parsed_args.__combine_base_model__(validator(data), flat)
 
     except ValidationError as e:
         if dmo.error == True:
@@ -193,16 +450,20 @@ def validate(request: Request, dmo: DanticModelObj) -> Any:
 
         # if dmo has error handler, use it, else use InvalidUsage error
         # 如果 dmo 有 error handler，使用它，否则使用 InvalidUsage 错误
-        error_msg = e.errors()[0]
-        message = f'{error_msg.get("loc")[0]} {error_msg.get("msg")}'
         if dmo.error:
             return dmo.error(request, e)
+
+        # the message is only built when no error handler consumes the error
+        # 只有在没有 error handler 处理错误时才生成错误信息
+        if PYDANTIC_V2:
+            error_msg = e.errors(include_url=False, include_context=False)[0]
         else:
             error_msg = e.errors()[0]
-            message = f'{error_msg.get("loc")[0]} {error_msg.get("msg")}'
-
-            error_logger.error(message)
-            raise InvalidUsage(message)
+        message = f'{error_msg["loc"][0]} {error_msg["msg"]}'
+        error_logger.error(message)
+        raise InvalidUsage(message)
+    except SanicException:
+        raise
     except Exception as e:
         raise ServerError(str(e))
     request.ctx.params = parsed_args
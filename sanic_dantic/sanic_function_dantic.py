@@ -42,9 +42,26 @@ def parse_params(
     :param error: error handler function
     """
 
+    def build_model_obj(_error):
+        return DanticModelObj(
+            header=header,
+            path=path,
+            query=query,
+            form=form,
+            body=body,
+            all=all,
+            error=_error,
+        )
+
     def decorator(f):
+        # DanticModelObj is built on the first request, like before, and is
+        # only rebuilt when the resolved error handler changes
+        # DanticModelObj 在第一次请求时创建，仅在 error handler 变化时重新创建
+        model_obj = None
+
         @wraps(f)
         async def decorated_function(request, *args, **kwargs):
+            nonlocal model_obj
             _request = [
                 item for item in (request,) + args
                 if isinstance(item, Request)
@@ -54,15 +71,11 @@ def parse_params(
             if methods:
                 hit = _request.method.lower() in [_.lower() for _ in methods]
             if not methods or hit:
-                model_obj = DanticModelObj(
-                    header=header,
-                    path=path,
-                    query=query,
-                    form=form,
-                    body=body,
-                    all=all,
-                    error=error or request.app.config.get('SANIC_DANTIC_ERROR', None),
+                _error = error or request.app.config.get(
+                    'SANIC_DANTIC_ERROR', None
                 )
+                if model_obj is None or model_obj.error is not _error:
+                    model_obj = build_model_obj(_error)
                 parsed_args = validate(_request, model_obj)
                 if isinstance(parsed_args, Coroutine):
                     return await parsed_args
@@ -11,7 +11,7 @@ from sanic import Sanic
 from sanic.response import json
 from sanic.views import HTTPMethodView
 
-from model import Person
+from model import Owner, Person, Secret, Shout
 from sanic_dantic import DanticView
 from sanic_dantic import parse_params
 
@@ -32,6 +32,14 @@ async def custom_exception_handler(request, message):
     )
 
 
+class UnhashableExceptionHandler:
+    def __eq__(self, other):
+        return self is other
+
+    async def __call__(self, request, error):
+        return json({"status_code": 422}, status=422)
+
+
 # -------------------------- define function view ------------------------------
 
 @app.route('/fbv_header_test', methods=['GET'])
@@ -79,6 +87,42 @@ async def fbv_body_test(request, params):
     })
 
 
+@app.route('/fbv_all_test', methods=['POST'])
+@parse_params(all=Person)
+async def fbv_all_test(request, params):
+    return json({
+        "ctx.params": request.ctx.params,
+        "params": params
+    })
+
+
+@app.route('/fbv_nested_test', methods=['POST'])
+@parse_params(body=Owner)
+async def fbv_nested_test(request, params):
+    return json({
+        "ctx.params": request.ctx.params,
+        "params": params
+    })
+
+
+@app.route('/fbv_exclude_test', methods=['GET'])
+@parse_params(query=Secret)
+async def fbv_exclude_test(request, params):
+    return json({
+        "ctx.params": request.ctx.params,
+        "params": params
+    })
+
+
+@app.route('/fbv_serialize_test', methods=['GET'])
+@parse_params(query=Shout)
+async def fbv_serialize_test(request, params):
+    return json({
+        "ctx.params": request.ctx.params,
+        "params": params
+    })
+
+
 @app.route('/fbv_error_test', methods=['PUT'])
 @parse_params(body=Person, error=custom_exception_handler)
 async def fbv_error_test(request, params):
@@ -88,6 +132,15 @@ async def fbv_error_test(request, params):
     })
 
 
+@app.route('/fbv_unhashable_error_test', methods=['PUT'])
+@parse_params(body=Person, error=UnhashableExceptionHandler())
+async def fbv_unhashable_error_test(request, params):
+    return json({
+        "ctx.params": request.ctx.params,
+        "params": params
+    })
+
+
 @app.route('/fbv_del_test', methods=['DELETE'])
 @parse_params(query=Person)
 async def fbv_delete_test(request, params):
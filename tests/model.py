@@ -9,7 +9,37 @@ CreateTime:  2023-01-23
 
 from pydantic import BaseModel, Field
 
+from sanic_dantic.basic_definition import PYDANTIC_V2
+
 
 class Person(BaseModel):
     name: str = Field(description="name")
     age: int = Field(description="age")
+
+
+class Pet(BaseModel):
+    name: str = Field(description="name")
+
+
+class Owner(BaseModel):
+    name: str = Field(description="name")
+    pet: Pet = Field(description="pet")
+
+
+class Secret(BaseModel):
+    name: str = Field(description="name")
+    secret: str = Field(None, description="secret", exclude=True)
+
+
+if PYDANTIC_V2:
+    from pydantic import field_serializer
+
+    class Shout(BaseModel):
+        name: str = Field(description="name")
+
+        @field_serializer('name')
+        def serialize_name(self, name):
+            return name.upper()
+else:
+    class Shout(BaseModel):
+        name: str = Field(description="name")
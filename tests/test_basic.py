@@ -12,8 +12,9 @@ from copy import deepcopy
 import pytest
 from sanic.exceptions import ServerError
 
-from model import Person
-from sanic_dantic import ParsedArgsObj, DanticModelObj
+from model import Owner, Person, Secret
+from sanic_dantic import ParsedArgsObj, DanticModelObj, parse_params
+from sanic_dantic.basic_definition import is_flat_model
 
 
 class TestBasic:
@@ -27,6 +28,38 @@ class TestBasic:
         assert obj.age == 18
         assert obj == {'name': 'Connor', 'age': 18}
 
+    def test_deepcopy(self):
+        obj = ParsedArgsObj(name='Connor', tags=['a', 'b'])
+        new = deepcopy(obj)
+        assert new == obj
+        assert isinstance(new, ParsedArgsObj)
+        assert new.name is obj.name
+        assert new.tags is not obj.tags
+
+    def test_combine_base_model(self):
+        obj = ParsedArgsObj()
+        obj.__combine_base_model__(Person(name='Connor', age='18'))
+        assert obj == {'name': 'Connor', 'age': 18}
+        assert obj.__fields_set__ == {'name', 'age'}
+
+    def test_fields_set_not_shared(self):
+        first = ParsedArgsObj()
+        first.__combine_base_model__(Person(name='Connor', age=18))
+        second = ParsedArgsObj()
+        assert first.__fields_set__ is not second.__fields_set__
+        assert second.__fields_set__ == set()
+
+    def test_set_fields_set(self):
+        obj = ParsedArgsObj()
+        obj.__fields_set__ = {'name'}
+        assert obj.__fields_set__ == {'name'}
+        assert '__fields_set__' not in obj
+
+    def test_is_flat_model(self):
+        assert is_flat_model(Person)
+        assert not is_flat_model(Owner)
+        assert not is_flat_model(Secret)
+
     def test_dantic_model(self):
         obj = DanticModelObj(
             header=Person, query=Person, path=Person, body=Person
@@ -42,6 +75,16 @@ class TestBasic:
         except Exception as e:
             assert isinstance(e, ServerError)
 
+    def test_lazy_model_obj(self):
+        async def handler(request, params):
+            return params
+
+        # misconfiguration is reported on the first request, not at decoration
+        decorator = parse_params(
+            body=Person, form=Person, error=lambda request, e: None
+        )
+        assert callable(decorator(handler))
+
     def test_not_base_model(self):
         try:
             DanticModelObj(body=ServerError)
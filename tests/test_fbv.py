@@ -9,6 +9,8 @@ CreateTime:  2023-01-23
 
 import pytest
 
+from sanic_dantic.basic_definition import PYDANTIC_V2
+
 
 @pytest.mark.usefixtures('test_client')
 class TestFbv:
@@ -43,6 +45,24 @@ class TestFbv:
         assert response.json['ctx.params'] == {'name': 'Connor', 'age': 18}
         assert response.json['params'] == {'name': 'Connor', 'age': 18}
 
+    def test_fbv_form_payload_json(self, test_client):
+        data = {
+            'name': 'Connor',
+            'age': '18',
+            'payload_json': '{"name": "Payload", "age": "20"}'
+        }
+        request, response = test_client.post('/fbv_form_test', data=data)
+        print(response.json)
+        assert response.status == 200
+        assert response.json['ctx.params'] == {'name': 'Connor', 'age': 18}
+        assert response.json['params'] == {'name': 'Connor', 'age': 18}
+
+    def test_fbv_form_payload_json_validated_alone(self, test_client):
+        data = {'age': '18', 'payload_json': '{"name": "Connor"}'}
+        request, response = test_client.post('/fbv_form_test', data=data)
+        print(response.json)
+        assert response.status == 400
+
     def test_fbv_body(self, test_client):
         data = {'name': 'Connor', 'age': '18'}
         request, response = test_client.post('/fbv_body_test', json=data)
@@ -51,6 +71,66 @@ class TestFbv:
         assert response.json['ctx.params'] == {'name': 'Connor', 'age': 18}
         assert response.json['params'] == {'name': 'Connor', 'age': 18}
 
+    def test_fbv_all_body(self, test_client):
+        data = {'name': 'Connor', 'age': '18'}
+        request, response = test_client.post('/fbv_all_test', json=data)
+        print(response.json)
+        assert response.status == 200
+        assert response.json['ctx.params'] == {'name': 'Connor', 'age': 18}
+        assert response.json['params'] == {'name': 'Connor', 'age': 18}
+
+    def test_fbv_all_json_media_type(self, test_client):
+        for content_type in ('application/vnd.api+json', 'text/plain'):
+            request, response = test_client.post(
+                '/fbv_all_test',
+                content='{"name": "Connor", "age": "18"}',
+                headers={'content-type': content_type}
+            )
+            print(response.json)
+            assert response.status == 200
+            assert response.json['params'] == {'name': 'Connor', 'age': 18}
+
+    def test_fbv_all_form(self, test_client):
+        data = {'name': 'Connor'}
+        params = {'age': '18'}
+        request, response = test_client.post(
+            '/fbv_all_test',
+            data=data,
+            params=params
+        )
+        print(response.json)
+        assert response.status == 200
+        assert response.json['ctx.params'] == {'name': 'Connor', 'age': 18}
+        assert response.json['params'] == {'name': 'Connor', 'age': 18}
+
+    def test_fbv_nested(self, test_client):
+        data = {'name': 'Connor', 'pet': {'name': 'Kitty'}}
+        request, response = test_client.post('/fbv_nested_test', json=data)
+        print(response.json)
+        assert response.status == 200
+        assert response.json['ctx.params'] == data
+        assert response.json['params'] == data
+
+    def test_fbv_exclude(self, test_client):
+        params = {'name': 'Connor', 'secret': 'leak'}
+        request, response = test_client.get('/fbv_exclude_test', params=params)
+        print(response.json)
+        assert response.status == 200
+        assert response.json['ctx.params'] == {'name': 'Connor'}
+        assert response.json['params'] == {'name': 'Connor'}
+
+    @pytest.mark.skipif(not PYDANTIC_V2, reason='field_serializer needs v2')
+    def test_fbv_serialize(self, test_client):
+        params = {'name': 'Connor'}
+        request, response = test_client.get(
+            '/fbv_serialize_test',
+            params=params
+        )
+        print(response.json)
+        assert response.status == 200
+        assert response.json['ctx.params'] == {'name': 'CONNOR'}
+        assert response.json['params'] == {'name': 'CONNOR'}
+
     def test_fbv_delete(self, test_client):
         params = {'name': 'Connor', 'age': '18'}
         request, response = test_client.delete('/fbv_del_test', params=params)
@@ -67,6 +147,16 @@ class TestFbv:
         assert response.json['message'] == 'age value is not a valid integer'
         assert response.json['status_code'] == 400
 
+    def test_fbv_unhashable_error(self, test_client):
+        params = {'name': 'Connor', 'age': 'name'}
+        request, response = test_client.put(
+            '/fbv_unhashable_error_test',
+            json=params
+        )
+        print(response.json)
+        assert response.status == 422
+        assert response.json['status_code'] == 422
+
 
 if __name__ == '__main__':
     pytest.main(['-s', 'test_fbv.py'])